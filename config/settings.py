@@ -1,3 +1,4 @@
+import os
 import streamlit as st
 
 # Page configuration
@@ -8,6 +9,15 @@ PAGE_CONFIG = {
     "initial_sidebar_state": "expanded"
 }
 
+# Memory budgets for extraction results held in session state; larger results spill to disk
+SESSION_MEMORY_BUDGET_BYTES = int(os.environ.get("CODEHARVEST_SESSION_MEMORY_MB", "64")) * 1024 * 1024
+GLOBAL_MEMORY_BUDGET_BYTES = int(os.environ.get("CODEHARVEST_GLOBAL_MEMORY_MB", "512")) * 1024 * 1024
+# Results of sessions idle for longer than this are evicted
+SPILL_SESSION_TTL_SECONDS = int(os.environ.get("CODEHARVEST_SESSION_TTL_SECONDS", "3600"))
+
+# Optional GitHub token; unauthenticated API calls are limited to 60 per hour
+GITHUB_TOKEN = os.environ.get("GITHUB_TOKEN", "")
+
 # Custom CSS styles
 CUSTOM_CSS = """
 <style>
@@ -0,0 +1,150 @@
+import hashlib
+import io
+import json
+import threading
+import unittest
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+from tools.codextractr import CodeExtractor
+
+REPO_FILES = {
+    'README.md': b'# Demo\n',
+    'src/app.py': b'print("app")\n',
+    'src/pkg/util.py': b'def util():\n    return 1\n',
+    'src/pkg/big.py': b'x = 1\n' * 400,
+    'docs/guide.md': b'guide\n' * 50,
+    'assets/logo.png': b'\x89PNG\r\n\x1a\n' + b'\0' * 64,
+}
+
+
+def _sha(data: bytes) -> str:
+    return hashlib.sha1(data).hexdigest()
+
+
+class StandInGitHub(BaseHTTPRequestHandler):
+    """Serves the trees, blobs and zipball endpoints used by sparse fetches"""
+    protocol_version = 'HTTP/1.1'
+    truncated = False
+    rate_limited = False
+    requests_seen = []
+    auth_seen = []
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, body: bytes, content_type: str):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        self.requests_seen.append(path)
+        self.auth_seen.append(self.headers.get('Authorization'))
+        if '/git/blobs/' in path and self.rate_limited:
+            self.send_error(403, 'API rate limit exceeded')
+        elif '/git/trees/' in path:
+            tree = [{'path': p, 'type': 'blob', 'size': len(d), 'sha': _sha(d)} for p, d in REPO_FILES.items()]
+            if self.truncated:
+                tree = tree[:2]
+            self._send(json.dumps({'tree': tree, 'truncated': self.truncated}).encode(), 'application/json')
+        elif '/git/blobs/' in path:
+            by_sha = {_sha(d): d for d in REPO_FILES.values()}
+            self._send(by_sha[path.rsplit('/', 1)[1]], 'application/octet-stream')
+        elif path.endswith('/zipball'):
+            buffer = io.BytesIO()
+            with zipfile.ZipFile(buffer, 'w') as archive:
+                for name, data in REPO_FILES.items():
+                    archive.writestr(f'owner-repo-abc123/{name}', data)
+            self._send(buffer.getvalue(), 'application/zip')
+        else:
+            self.send_error(404)
+
+
+class SparseFetchTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), StandInGitHub)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        StandInGitHub.truncated = False
+        StandInGitHub.rate_limited = False
+        StandInGitHub.requests_seen = []
+        StandInGitHub.auth_seen = []
+        self.extractor = CodeExtractor(f"http://127.0.0.1:{self.server.server_port}", github_token="")
+
+    def extract(self, **kwargs):
+        return self.extractor.extract_from_github('https://github.com/owner/repo', sparse=True, **kwargs)
+
+    def test_downloads_only_matching_blobs(self):
+        result = self.extract(include_patterns='src/**/*.py', max_size_kb=1)
+
+        self.assertEqual(result['sparse']['mode'], 'blobs')
+        self.assertEqual(sorted(result['file_contents']), ['src/app.py', 'src/pkg/util.py'])
+        self.assertEqual(result['file_contents']['src/pkg/util.py'], REPO_FILES['src/pkg/util.py'].decode())
+        blob_requests = [p for p in StandInGitHub.requests_seen if '/git/blobs/' in p]
+        self.assertEqual(len(blob_requests), 2)
+        self.assertNotIn('/repos/owner/repo/zipball', StandInGitHub.requests_seen)
+
+    def test_oversized_entries_are_listed_as_skipped(self):
+        result = self.extract(include_patterns='src/**/*.py', max_size_kb=1)
+
+        self.assertEqual(result['skipped_count'], 1)
+        self.assertIn('## SKIPPED FILES', result['content'])
+        self.assertIn('- src/pkg/big.py (size: 2KB)', result['content'])
+
+    def test_falls_back_to_zipball_above_selection_ratio(self):
+        self.extractor.sparse_zipball_ratio = 0.0
+        result = self.extract(include_patterns='src/app.py')
+
+        self.assertEqual(result['sparse']['mode'], 'zipball')
+        self.assertEqual(list(result['file_contents']), ['src/app.py'])
+        self.assertFalse(any('/git/blobs/' in p for p in StandInGitHub.requests_seen))
+
+    def test_truncated_listing_filters_archive_members(self):
+        StandInGitHub.truncated = True
+        result = self.extract(include_patterns='src/**/*.py', max_size_kb=1)
+
+        self.assertEqual(result['sparse']['mode'], 'zipball')
+        self.assertEqual(sorted(result['file_contents']), ['src/app.py', 'src/pkg/util.py'])
+        self.assertIn('- src/pkg/big.py (size: 2KB)', result['content'])
+        self.assertEqual(result['sparse']['selected_files'], 2)
+
+    def test_falls_back_to_zipball_above_blob_count(self):
+        self.extractor.sparse_max_blobs = 1
+        result = self.extract(include_patterns='src/**/*.py', max_size_kb=1)
+
+        self.assertEqual(result['sparse']['mode'], 'zipball')
+        self.assertEqual(sorted(result['file_contents']), ['src/app.py', 'src/pkg/util.py'])
+        self.assertFalse(any('/git/blobs/' in p for p in StandInGitHub.requests_seen))
+
+    def test_sends_token_when_configured(self):
+        self.extractor.github_token = 'secret'
+        self.extract(include_patterns='src/app.py')
+
+        self.assertEqual(set(StandInGitHub.auth_seen), {'Bearer secret'})
+
+    def test_blob_failure_stops_remaining_downloads(self):
+        StandInGitHub.rate_limited = True
+        self.extractor.sparse_max_workers = 1
+        self.extractor.sparse_zipball_ratio = 1.0
+
+        with self.assertRaises(Exception):
+            self.extract(include_patterns='*', max_size_kb=10)
+        # The single worker may already have picked up the next blob, but the rest are cancelled
+        blob_requests = [p for p in StandInGitHub.requests_seen if '/git/blobs/' in p]
+        self.assertLessEqual(len(blob_requests), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
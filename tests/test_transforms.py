@@ -0,0 +1,82 @@
+import unittest
+
+from utils.transforms import apply_transforms, create_transforms
+
+
+def strip_comments(source: str, path: str) -> str:
+    transforms = create_transforms(["Strip comments"])
+    return apply_transforms(transforms, source.splitlines(keepends=True), path)[0]
+
+
+class CommentStripTest(unittest.TestCase):
+    def test_python_keeps_markers_inside_triple_quoted_strings(self):
+        source = 'x = """\n# heading in a string\n"""\n# dropped\ny = 1  # kept\ns = "#x"\n'
+
+        self.assertEqual(strip_comments(source, 'a.py'),
+                         'x = """\n# heading in a string\n"""\ny = 1  # kept\ns = "#x"\n')
+
+    def test_python_keeps_shebang(self):
+        self.assertEqual(strip_comments('#!/usr/bin/env python\n# c\nx = 1\n', 'a.py'),
+                         '#!/usr/bin/env python\nx = 1\n')
+
+    def test_c_line_comment_continues_after_backslash(self):
+        source = 'int a; /* ok */\n// first \\\n   still a comment\nint b;\n'
+
+        self.assertEqual(strip_comments(source, 'a.c'), 'int a; /* ok */\nint b;\n')
+
+    def test_c_string_continues_after_backslash(self):
+        source = 'char *s = "a\\\n// in string";\n'
+
+        self.assertEqual(strip_comments(source, 'a.c'), source)
+
+    def test_cpp_raw_string(self):
+        source = 'auto r = R"tag(\n// raw\n)" not closed\n)tag";\n// dropped\n'
+
+        self.assertEqual(strip_comments(source, 'a.cpp'), 'auto r = R"tag(\n// raw\n)" not closed\n)tag";\n')
+
+    def test_block_comment_parts_are_cut_from_code_lines(self):
+        source = 'a();\n/* one\n two */ b();\nc(); /* three\n four */\n'
+
+        self.assertEqual(strip_comments(source, 'a.java'), 'a();\nb();\nc();\n')
+
+    def test_js_template_literal(self):
+        source = 'const t = `\n// inside template\n/* also */\n`;\n// dropped\n'
+
+        self.assertEqual(strip_comments(source, 'a.js'), 'const t = `\n// inside template\n/* also */\n`;\n')
+
+    def test_js_regex_literals_do_not_open_comments(self):
+        for source in ("p = p.replace(/\\/*$/, '');\nconst x = 1;\nfoo();\n",
+                       "const re = /[/*]/;\nconst x = 1;\n",
+                       "if (ok) return /'/.test(s);\nconst x = 1;\n"):
+            with self.subTest(source=source):
+                self.assertEqual(strip_comments(source, 'a.ts'), source)
+
+    def test_js_division_is_not_a_regex(self):
+        source = 'const half = total / 2; /* start\nmiddle\n*/\nconst y = a / b / c;\n'
+
+        self.assertEqual(strip_comments(source, 'a.js'), 'const half = total / 2;\nconst y = a / b / c;\n')
+
+    def test_unsupported_languages_are_left_alone(self):
+        source = 'cat <<EOF\n# not a comment\nEOF\n'
+
+        self.assertEqual(strip_comments(source, 'run.sh'), source)
+
+
+class LicenseHeaderTest(unittest.TestCase):
+    def test_shebang_is_kept_and_not_part_of_header(self):
+        transforms = create_transforms(["Drop duplicate license headers"])
+        header = '# Copyright 2020 ACME, license MIT\n'
+        outputs = [
+            apply_transforms(transforms, source.splitlines(keepends=True), 'a.py')[0]
+            for source in ('#!/usr/bin/env python\n' + header + 'a = 1\n',
+                           '#!/usr/bin/python3\n' + header + 'b = 1\n',
+                           header + 'c = 1\n')
+        ]
+
+        self.assertEqual(outputs, ['#!/usr/bin/env python\n' + header + 'a = 1\n',
+                                   '#!/usr/bin/python3\nb = 1\n',
+                                   'c = 1\n'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,14 +1,51 @@
 import streamlit as st
 import os
+import asyncio
+import base64
+import functools
+import io
+import shutil
+import uuid
+import fnmatch
 import tempfile
 import zipfile
 import requests
+from requests.adapters import HTTPAdapter
 from pathlib import Path
 import mimetypes
-from typing import Dict, List
+import mmap
+import re
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from config.settings import (GITHUB_TOKEN, GLOBAL_MEMORY_BUDGET_BYTES, SESSION_MEMORY_BUDGET_BYTES,
+                             SPILL_SESSION_TTL_SECONDS)
+from typing import AsyncIterator, Callable, Dict, List, Optional, Pattern, Tuple
+from urllib.parse import urlparse
+from utils.exporters import EXPORT_FORMATS, create_exporters, discard_exporters, finish_exporters
+from utils.helpers import format_file_size
+from utils.metrics import MetricsCollector
+from utils.spill import SpillManager
+from utils.transforms import (TRANSFORMS, apply_transforms, create_transforms, license_header_owners,
+                              seed_license_headers, transform_savings)
+from utils.snapshots import (HashingReader, diff_manifests, diff_snapshots, file_hash, manifest_from_json,
+                             manifest_to_json)
 
 class CodeExtractor:
-    def __init__(self):
+    def __init__(self, github_api_base: str = "https://api.github.com", github_token: Optional[str] = None):
+        # Overridable so sparse fetches can run against a local stand-in server
+        self.github_api_base = github_api_base.rstrip('/')
+        self.github_token = github_token if github_token is not None else GITHUB_TOKEN
+        self.sparse_max_workers = 8
+        # Above this share of the repo's bytes, sparse mode downloads the zipball instead
+        self.sparse_zipball_ratio = 0.6
+        # Each blob is one API call, so past this many files one zipball is used instead;
+        # unauthenticated clients only get 60 calls per hour
+        self.sparse_max_blobs = 1000 if self.github_token else 40
+        # (connect, read) timeouts for every GitHub request, so a stalled connection fails instead of hanging
+        self.http_timeout = (10, 60)
+        # Head/tail window and match limits for partially extracted large files
+        self.partial_window_bytes = 16 * 1024
+        self.partial_max_matches = 20
+        
         self.default_ignore_patterns = {
             'node_modules', '__pycache__', '.git', '.vscode', '.idea', 
             'dist', 'build', 'target', '.gradle', 'bin', 'obj',
@@ -55,13 +92,25 @@ class CodeExtractor:
             return True
 
     def extract_from_folder(self, folder_path: str, max_size_kb: int = 500, 
-                          include_binary: bool = False, custom_patterns: str = "") -> Dict:
+                          include_binary: bool = False, custom_patterns: str = "",
+                          exporters: Optional[List] = None, partial_large_files: bool = False,
+                          partial_pattern: str = "", transforms: Optional[List[str]] = None,
+                          pre_skipped: Optional[List[str]] = None) -> Dict:
+        # pre_skipped lists files filtered out before they reached folder_path (e.g. by a sparse fetch)
         max_size_bytes = max_size_kb * 1024
         ignore_patterns = self.default_ignore_patterns.copy()
         
         if custom_patterns:
             ignore_patterns.update(p.strip() for p in custom_patterns.split(',') if p.strip())
         
+        # Validate the match pattern before any output is built
+        partial_regex = None
+        if partial_large_files and partial_pattern:
+            try:
+                partial_regex = re.compile(partial_pattern.encode('utf-8'))
+            except re.error as e:
+                raise ValueError(f"Invalid match pattern '{partial_pattern}': {e}")
+        
         content = []
         content.append(f"# Project Code Extract: {os.path.basename(folder_path)}\n")
         content.append(f"# Source: {folder_path}\n")
@@ -78,9 +127,90 @@ class CodeExtractor:
         content.append("## FILE CONTENTS\n\n")
         
         file_count = 0
-        skipped_files = []
+        skipped_files = list(pre_skipped or [])
+        partial_files = []
         file_contents = {}
+        manifest = {}
+        metrics = MetricsCollector(self.code_extensions)
+        # Transforms keep per-extraction state (seen license headers, bytes saved)
+        active_transforms = create_transforms(transforms or [])
+        
+        for file_path, relative_path, file_size, is_binary, is_partial in self._iter_candidate_files(
+                folder_path, max_size_bytes, include_binary, ignore_patterns, partial_large_files, skipped_files):
+            try:
+                # Line counts describe the file on disk, so windowed files and placeholders get none
+                line_count = None
+                if is_binary:
+                    file_content = "[Binary file - content not displayed]\n"
+                    file_digest = file_hash(file_path)
+                elif is_partial:
+                    file_content = self._read_partial(file_path, file_size, partial_regex)
+                    file_digest = file_hash(file_path)
+                    partial_files.append(f"{relative_path} (size: {file_size//1024}KB)")
+                else:
+                    file_content, line_count, file_digest = self._read_text(file_path, relative_path, active_transforms)
+                
+                # Only emit the section once the file was read, so errors never leave an open fence
+                content.append(f"### {relative_path}\n")
+                content.append("```")
+                content.append(file_content)
+                content.append("```\n\n")
+                
+                # Store individual file content
+                file_contents[relative_path] = file_content
+                file_count += 1
+                metrics.add_file(relative_path, file_size, line_count)
+                # The manifest describes the file on disk, independent of transforms and windowing
+                manifest[relative_path] = {'size': file_size, 'hash': file_digest}
+                
+                # Stream the file into any structured exporters
+                for exporter in exporters or []:
+                    exporter.add_file(relative_path, file_content)
+                
+            except Exception as e:
+                skipped_files.append(f"{relative_path} (error: {str(e)})")
+        
+        if skipped_files:
+            content.append("## SKIPPED FILES\n")
+            content.append("The following files were skipped:\n")
+            for skipped in skipped_files[:20]:
+                content.append(f"- {skipped}\n")
+            if len(skipped_files) > 20:
+                content.append(f"... and {len(skipped_files) - 20} more files\n")
+            content.append("\n")
+        
+        if partial_files:
+            content.append("## PARTIALLY EXTRACTED FILES\n")
+            content.append("The following files exceeded the size limit and were windowed:\n")
+            for partial in partial_files:
+                content.append(f"- {partial}\n")
+            content.append("\n")
         
+        return {
+            'content': "".join(content),
+            'file_contents': file_contents,
+            'file_count': file_count,
+            'skipped_count': len(skipped_files),
+            'partial_count': len(partial_files),
+            'metrics': metrics.summary(),
+            'manifest': manifest,
+            # Saved alongside the manifest so later diffs re-read files the same way
+            'manifest_options': {
+                'max_size_kb': max_size_kb,
+                'include_binary': include_binary,
+                'custom_patterns': custom_patterns,
+                'partial_large_files': partial_large_files,
+                'partial_pattern': partial_pattern,
+                'transforms': list(transforms or []),
+                # Which file kept each license header, so re-reads drop duplicates the same way
+                'license_headers': license_header_owners(active_transforms),
+            },
+            'transform_savings': transform_savings(active_transforms)
+        }
+
+    def _iter_candidate_files(self, folder_path: str, max_size_bytes: int, include_binary: bool,
+                              ignore_patterns: set, partial_large_files: bool, skipped_files: List[str]):
+        """Yield (path, relative path, size, is_binary, is_partial) for every file an extraction would include"""
         for root, dirs, files in os.walk(folder_path):
             dirs[:] = [d for d in dirs if not self.should_ignore_file(os.path.join(root, d), ignore_patterns)]
             
@@ -93,7 +223,8 @@ class CodeExtractor:
                 
                 try:
                     file_size = os.path.getsize(file_path)
-                    if file_size > max_size_bytes:
+                    is_partial = file_size > max_size_bytes
+                    if is_partial and not partial_large_files:
                         skipped_files.append(f"{relative_path} (size: {file_size//1024}KB)")
                         continue
                 except:
@@ -102,50 +233,166 @@ class CodeExtractor:
                 file_ext = os.path.splitext(file)[1].lower()
                 is_binary = self.is_binary_file(file_path)
                 
+                if is_partial and is_binary:
+                    skipped_files.append(f"{relative_path} (size: {file_size//1024}KB)")
+                    continue
+                
                 if is_binary and not include_binary:
                     if file_ext not in self.code_extensions:
                         continue
                 
+                yield file_path, relative_path, file_size, is_binary, is_partial
+
+    def _read_text(self, file_path: str, relative_path: str, active_transforms: List) -> Tuple[str, int, str]:
+        """Read a text file, returning its (possibly transformed) content, line count and raw-bytes hash"""
+        with open(file_path, 'rb') as raw:
+            # Hash the bytes as they are decoded, so the file is only read once
+            reader = HashingReader(raw)
+            with io.TextIOWrapper(io.BufferedReader(reader), encoding='utf-8', errors='ignore') as f:
+                if active_transforms:
+                    # Stream lines through the compaction stage instead of reading the file whole
+                    file_content, line_count = apply_transforms(active_transforms, f, relative_path)
+                else:
+                    file_content = f.read()
+                    # str.count scans in C; a final line without a newline still counts
+                    line_count = file_content.count('\n') + (not file_content.endswith('\n') and file_content != "")
+                file_digest = reader.hexdigest()
+        if not file_content.endswith('\n'):
+            file_content += '\n'
+        return file_content, line_count, file_digest
+
+    def scan_manifest(self, folder_path: str, max_size_kb: int = 500, include_binary: bool = False,
+                      custom_patterns: str = "", partial_large_files: bool = False) -> Dict:
+        """Build a manifest by hashing raw bytes only, without rendering any extract"""
+        ignore_patterns = self.default_ignore_patterns.copy()
+        if custom_patterns:
+            ignore_patterns.update(p.strip() for p in custom_patterns.split(',') if p.strip())
+        
+        manifest = {}
+        for file_path, relative_path, file_size, _, _ in self._iter_candidate_files(
+                folder_path, max_size_kb * 1024, include_binary, ignore_patterns, partial_large_files, []):
+            try:
+                manifest[relative_path] = {'size': file_size, 'hash': file_hash(file_path)}
+            except OSError:
+                continue
+        return manifest
+
+    def diff_against_folder(self, old_manifest: Dict, folder_path: str, options: Optional[Dict] = None,
+                            old_contents: Optional[Dict] = None) -> Dict:
+        """Diff a live folder against an earlier snapshot's manifest, using the options it was taken with
+        
+        Only files whose hash changed are read back, with the snapshot's transforms and windowing.
+        """
+        options = options or {}
+        max_size_kb = options.get('max_size_kb', 500)
+        current_manifest = self.scan_manifest(folder_path, max_size_kb, options.get('include_binary', False),
+                                              options.get('custom_patterns', ""),
+                                              options.get('partial_large_files', False))
+        changes = diff_manifests(old_manifest, current_manifest)
+        
+        new_contents = {}
+        if old_contents is not None:
+            transforms = options.get('transforms') or []
+            partial_regex = None
+            if options.get('partial_large_files') and options.get('partial_pattern'):
                 try:
-                    content.append(f"### {relative_path}\n")
-                    content.append("```")
-                    
-                    if is_binary:
-                        file_content = "[Binary file - content not displayed]\n"
+                    partial_regex = re.compile(options['partial_pattern'].encode('utf-8'))
+                except re.error as e:
+                    raise ValueError(f"Invalid match pattern '{options['partial_pattern']}': {e}")
+            max_size_bytes = max_size_kb * 1024
+            
+            for path in changes['modified']:
+                if path not in old_contents:
+                    continue
+                file_path = os.path.join(folder_path, path)
+                file_size = current_manifest[path]['size']
+                try:
+                    if self.is_binary_file(file_path):
+                        continue
+                    if file_size > max_size_bytes:
+                        new_contents[path] = self._read_partial(file_path, file_size, partial_regex)
                     else:
-                        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                            file_content = f.read()
-                            if not file_content.endswith('\n'):
-                                file_content += '\n'
-                    
-                    content.append(file_content)
-                    content.append("```\n\n")
-                    
-                    # Store individual file content
-                    file_contents[relative_path] = file_content
-                    file_count += 1
-                    
-                except Exception as e:
-                    skipped_files.append(f"{relative_path} (error: {str(e)})")
+                        active_transforms = create_transforms(transforms)
+                        seed_license_headers(active_transforms, options.get('license_headers', {}), path)
+                        new_contents[path] = self._read_text(file_path, path, active_transforms)[0]
+                except OSError:
+                    continue
         
-        if skipped_files:
-            content.append("## SKIPPED FILES\n")
-            content.append("The following files were skipped:\n")
-            for skipped in skipped_files[:20]:
-                content.append(f"- {skipped}\n")
-            if len(skipped_files) > 20:
-                content.append(f"... and {len(skipped_files) - 20} more files\n")
-            content.append("\n")
+        changes = diff_snapshots(old_manifest, current_manifest, old_contents, new_contents, changes=changes)
+        changes['manifest'] = current_manifest
+        return changes
+
+    def _read_partial(self, file_path: str, file_size: int, pattern: Optional[Pattern[bytes]] = None) -> str:
+        """Memory-map an oversized text file and return its head, tail and pattern matches"""
+        window = self.partial_window_bytes
         
-        return {
-            'content': "".join(content),
-            'file_contents': file_contents,
-            'file_count': file_count,
-            'skipped_count': len(skipped_files)
-        }
+        with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            # Cut windows on line boundaries so the snippets stay readable
+            head_end = mm.rfind(b'\n', 0, window) + 1 or window
+            # The file's final byte is excluded, or a trailing newline would leave an empty tail
+            tail_from = max(file_size - window, head_end)
+            tail_start = mm.find(b'\n', tail_from, file_size - 1) + 1 or tail_from
+            
+            parts = [f"[Partial extract: {file_size} bytes total, showing the first {head_end} "
+                     f"and last {file_size - tail_start} bytes]\n"]
+            parts.append(mm[:head_end].decode('utf-8', errors='ignore'))
+            
+            if pattern:
+                matches = []
+                # Only the elided middle is scanned
+                for match in pattern.finditer(mm, head_end, tail_start):
+                    line_start = mm.rfind(b'\n', 0, match.start()) + 1
+                    line_end = mm.find(b'\n', match.end())
+                    line_end = file_size if line_end == -1 else line_end
+                    line = mm[line_start:min(line_end, line_start + 200)].decode('utf-8', errors='ignore')
+                    matches.append(f"@{line_start}: {line}\n")
+                    if len(matches) >= self.partial_max_matches:
+                        break
+                if matches:
+                    label = pattern.pattern.decode('utf-8', errors='ignore')
+                    parts.append(f"\n... [matches for /{label}/ in the elided middle, by byte offset] ...\n")
+                    parts.extend(matches)
+            
+            elided = tail_start - head_end
+            if elided:
+                parts.append(f"\n... [{elided} bytes elided] ...\n\n")
+            parts.append(mm[tail_start:].decode('utf-8', errors='ignore'))
+        
+        content = "".join(parts)
+        return content if content.endswith('\n') else content + '\n'
 
     def extract_from_github(self, repo_url: str, max_size_kb: int = 500, 
-                          include_binary: bool = False, custom_patterns: str = "") -> Dict:
+                          include_binary: bool = False, custom_patterns: str = "",
+                          exporters: Optional[List] = None, sparse: bool = False,
+                          include_patterns: str = "", ref: str = "HEAD",
+                          partial_large_files: bool = False, partial_pattern: str = "",
+                          transforms: Optional[List[str]] = None) -> Dict:
+        owner, repo = self._parse_github_url(repo_url)
+        
+        if sparse:
+            return self._extract_sparse_from_github(
+                owner, repo, ref, max_size_kb, include_binary, custom_patterns,
+                include_patterns, exporters, partial_large_files, partial_pattern, transforms
+            )
+        
+        with tempfile.TemporaryDirectory() as temp_dir, self._github_session(1) as session:
+            repo_folder = self._download_zipball(session, owner, repo, ref, temp_dir)
+            
+            # Extract code
+            return self.extract_from_folder(repo_folder, max_size_kb, include_binary, custom_patterns,
+                                            exporters, partial_large_files, partial_pattern, transforms)
+
+    def _github_session(self, pool_size: int) -> requests.Session:
+        """Session with a connection pool of pool_size, authenticated when a token is configured"""
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        if self.github_token:
+            session.headers['Authorization'] = f"Bearer {self.github_token}"
+        return session
+
+    def _parse_github_url(self, repo_url: str) -> Tuple[str, str]:
         # Parse GitHub URL
         if 'github.com' not in repo_url:
             raise ValueError("Invalid GitHub URL")
@@ -155,34 +402,182 @@ class CodeExtractor:
         if len(parts) < 2:
             raise ValueError("Invalid GitHub URL format")
         
-        owner = parts[-2]
-        repo = parts[-1]
+        return parts[-2], parts[-1]
+
+    def _download_zipball(self, session, owner: str, repo: str, ref: str, temp_dir: str,
+                          select: Optional[Callable[[List[Dict]], List[Dict]]] = None) -> str:
+        """Download and unpack a zipball, optionally keeping only the entries chosen by select
+
+        select receives tree-style entries ({'path', 'type', 'size'}) built from the
+        archive's ZipInfo metadata and returns the ones to unpack.
+        """
+        download_url = f"{self.github_api_base}/repos/{owner}/{repo}/zipball"
+        if ref and ref != "HEAD":
+            download_url += f"/{ref}"
         
-        # Download repository
-        download_url = f"https://api.github.com/repos/{owner}/{repo}/zipball"
+        # Download zip file
+        response = session.get(download_url, timeout=self.http_timeout)
+        response.raise_for_status()
         
-        with tempfile.TemporaryDirectory() as temp_dir:
-            # Download zip file
-            response = requests.get(download_url)
-            response.raise_for_status()
+        zip_path = os.path.join(temp_dir, "repo.zip")
+        with open(zip_path, 'wb') as f:
+            f.write(response.content)
+        
+        # Extract zip
+        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+            if select is None:
+                zip_ref.extractall(temp_dir)
+            else:
+                # Zipball entries are prefixed with a single "<owner>-<repo>-<sha>/" folder
+                infos = zip_ref.infolist()
+                if infos:
+                    os.makedirs(os.path.join(temp_dir, infos[0].filename.split('/', 1)[0]), exist_ok=True)
+                entries = [
+                    {'path': info.filename.split('/', 1)[-1], 'type': 'blob', 'size': info.file_size,
+                     'zip_name': info.filename}
+                    for info in infos if not info.is_dir() and '/' in info.filename
+                ]
+                for entry in select(entries):
+                    zip_ref.extract(entry['zip_name'], temp_dir)
+        os.remove(zip_path)
+        
+        # Find extracted folder
+        extracted_folders = [d for d in os.listdir(temp_dir) if os.path.isdir(os.path.join(temp_dir, d))]
+        if not extracted_folders:
+            raise ValueError("No folders found in downloaded repository")
+        
+        return os.path.join(temp_dir, extracted_folders[0])
+
+    def _matches_include(self, path: str, include_patterns: List[str]) -> bool:
+        if not include_patterns:
+            return True
+        # fnmatch's "*" already crosses "/", so "src/**/*.py" should also match "src/a.py"
+        return any(fnmatch.fnmatch(path, pattern) or fnmatch.fnmatch(path, pattern.replace('**/', ''))
+                   for pattern in include_patterns)
+
+    def _select_tree_entries(self, tree: List[Dict], max_size_bytes: int, include_binary: bool,
+                             ignore_patterns: set, include_patterns: List[str]) -> Tuple[List[Dict], List[str]]:
+        """Filter a tree listing on metadata alone, before anything is downloaded"""
+        selected = []
+        oversized = []
+        
+        for entry in tree:
+            if entry.get('type') != 'blob':
+                continue
             
-            zip_path = os.path.join(temp_dir, "repo.zip")
-            with open(zip_path, 'wb') as f:
-                f.write(response.content)
+            path = entry['path']
+            if self.should_ignore_file(path, ignore_patterns) or not self._matches_include(path, include_patterns):
+                continue
             
-            # Extract zip
-            with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-                zip_ref.extractall(temp_dir)
+            file_ext = os.path.splitext(path)[1].lower()
+            if not include_binary and file_ext not in self.code_extensions:
+                mime_type, _ = mimetypes.guess_type(path)
+                if mime_type and not mime_type.startswith('text'):
+                    continue
+            
+            if entry.get('size', 0) > max_size_bytes:
+                oversized.append(f"{path} (size: {entry['size']//1024}KB)")
+                continue
+            
+            selected.append(entry)
+        
+        return selected, oversized
+
+    def _fetch_blob(self, session, owner: str, repo: str, entry: Dict, repo_folder: str):
+        url = f"{self.github_api_base}/repos/{owner}/{repo}/git/blobs/{entry['sha']}"
+        response = session.get(url, headers={'Accept': 'application/vnd.github.raw'},
+                               timeout=self.http_timeout)
+        response.raise_for_status()
+        
+        data = response.content
+        if response.headers.get('Content-Type', '').startswith('application/json'):
+            # Servers that ignore the raw media type return base64 JSON
+            data = base64.b64decode(response.json()['content'])
+        
+        target = os.path.join(repo_folder, *entry['path'].split('/'))
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, 'wb') as f:
+            f.write(data)
+
+    def _extract_sparse_from_github(self, owner: str, repo: str, ref: str, max_size_kb: int,
+                                    include_binary: bool, custom_patterns: str, include_patterns: str,
+                                    exporters: Optional[List], partial_large_files: bool = False,
+                                    partial_pattern: str = "", transforms: Optional[List[str]] = None) -> Dict:
+        ignore_patterns = self.default_ignore_patterns.copy()
+        if custom_patterns:
+            ignore_patterns.update(p.strip() for p in custom_patterns.split(',') if p.strip())
+        includes = [p.strip() for p in include_patterns.split(',') if p.strip()]
+        
+        session = self._github_session(self.sparse_max_workers)
+        
+        try:
+            # One request lists every path, size and blob sha for the ref
+            tree_url = f"{self.github_api_base}/repos/{owner}/{repo}/git/trees/{ref}"
+            response = session.get(tree_url, params={'recursive': '1'}, timeout=self.http_timeout)
+            response.raise_for_status()
+            listing = response.json()
+            tree = listing.get('tree', [])
             
-            # Find extracted folder
-            extracted_folders = [d for d in os.listdir(temp_dir) if os.path.isdir(os.path.join(temp_dir, d))]
-            if not extracted_folders:
-                raise ValueError("No folders found in downloaded repository")
+            # Oversized blobs are still needed when they will be windowed locally
+            size_limit = float('inf') if partial_large_files else max_size_kb * 1024
+            selected, oversized = self._select_tree_entries(
+                tree, size_limit, include_binary, ignore_patterns, includes
+            )
             
-            repo_folder = os.path.join(temp_dir, extracted_folders[0])
+            total_bytes = sum(e.get('size', 0) for e in tree if e.get('type') == 'blob')
+            selected_bytes = sum(e.get('size', 0) for e in selected)
+            ratio = selected_bytes / total_bytes if total_bytes else 0.0
+            use_zipball = (listing.get('truncated', False) or ratio > self.sparse_zipball_ratio
+                           or len(selected) > self.sparse_max_blobs)
             
-            # Extract code
-            return self.extract_from_folder(repo_folder, max_size_kb, include_binary, custom_patterns)
+            with tempfile.TemporaryDirectory() as temp_dir:
+                if use_zipball and listing.get('truncated', False):
+                    # The listing is incomplete, so apply the same filters to the archive's own metadata
+                    def select_from_archive(entries):
+                        nonlocal selected, oversized
+                        selected, oversized = self._select_tree_entries(
+                            entries, size_limit, include_binary, ignore_patterns, includes
+                        )
+                        return selected
+                    
+                    repo_folder = self._download_zipball(session, owner, repo, ref, temp_dir,
+                                                         select_from_archive)
+                    selected_bytes = sum(e.get('size', 0) for e in selected)
+                elif use_zipball:
+                    # Most of the repo is wanted anyway, so one archive is cheaper than many blobs
+                    wanted = {e['path'] for e in selected}
+                    repo_folder = self._download_zipball(
+                        session, owner, repo, ref, temp_dir,
+                        lambda entries: [e for e in entries if e['path'] in wanted]
+                    )
+                else:
+                    repo_folder = os.path.join(temp_dir, repo)
+                    os.makedirs(repo_folder)
+                    with ThreadPoolExecutor(max_workers=self.sparse_max_workers) as pool:
+                        futures = [pool.submit(self._fetch_blob, session, owner, repo, entry, repo_folder)
+                                   for entry in selected]
+                        # Stop queueing downloads at the first failure (e.g. a rate-limit 403)
+                        done, pending = wait(futures, return_when=FIRST_EXCEPTION)
+                        for future in pending:
+                            future.cancel()
+                        for future in done:
+                            future.result()
+                
+                result = self.extract_from_folder(repo_folder, max_size_kb, include_binary, custom_patterns,
+                                                  exporters, partial_large_files, partial_pattern,
+                                                  transforms, pre_skipped=oversized)
+        finally:
+            session.close()
+        
+        result['sparse'] = {
+            'mode': 'zipball' if use_zipball else 'blobs',
+            'listed_files': sum(1 for e in tree if e.get('type') == 'blob'),
+            'selected_files': len(selected),
+            'selected_bytes': selected_bytes,
+            'selection_ratio': ratio,
+            'oversized': oversized
+        }
+        return result
 
     def _generate_tree_structure(self, folder_path: str, ignore_patterns: set, prefix: str = "", is_last: bool = True) -> List[str]:
         tree_lines = []
@@ -208,10 +603,177 @@ class CodeExtractor:
         
         return tree_lines
 
+class _BatchRun:
+    """Per-call concurrency state, so overlapping iter_results calls never share it"""
+
+    def __init__(self, max_concurrency: int, extract_workers: int):
+        self.global_semaphore = asyncio.Semaphore(max_concurrency)
+        self.host_semaphores = {}
+        self.host_locks = {}
+        self.host_last_start = {}
+        self.download_pool = ThreadPoolExecutor(max_workers=max_concurrency)
+        self.extract_pool = ThreadPoolExecutor(max_workers=extract_workers)
+        self.temp_dirs = []
+
+class BatchGitHubExtractor:
+    """Extract many GitHub repositories concurrently with asyncio"""
+
+    def __init__(self, extractor: CodeExtractor, max_concurrency: int = 8,
+                 per_host_limit: Optional[int] = None, per_host_interval: float = 0.25,
+                 extract_workers: Optional[int] = None):
+        self.extractor = extractor
+        self.max_concurrency = max_concurrency
+        # Every archive comes from the extractor's single API host, so by default the
+        # per-host limit matches the global one instead of silently capping it
+        self.per_host_limit = per_host_limit or max_concurrency
+        # Minimum delay between two downloads starting against the same host
+        self.per_host_interval = per_host_interval
+        self.extract_workers = extract_workers or os.cpu_count() or 2
+
+    async def _host_slot(self, run: _BatchRun, host: str):
+        if host not in run.host_semaphores:
+            run.host_semaphores[host] = asyncio.Semaphore(self.per_host_limit)
+            run.host_locks[host] = asyncio.Lock()
+            run.host_last_start[host] = 0.0
+        
+        await run.host_semaphores[host].acquire()
+        try:
+            async with run.host_locks[host]:
+                loop = asyncio.get_running_loop()
+                wait = run.host_last_start[host] + self.per_host_interval - loop.time()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                run.host_last_start[host] = loop.time()
+        except BaseException:
+            run.host_semaphores[host].release()
+            raise
+
+    async def _extract_one(self, run: _BatchRun, repo_url: str, session, extract_kwargs: Dict) -> Dict:
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        host = urlparse(self.extractor.github_api_base).netloc
+        temp_dir = tempfile.mkdtemp()
+        run.temp_dirs.append(temp_dir)
+        
+        try:
+            owner, repo = self.extractor._parse_github_url(repo_url)
+            
+            # Network wait: bounded globally and per host
+            async with run.global_semaphore:
+                await self._host_slot(run, host)
+                try:
+                    repo_folder = await loop.run_in_executor(
+                        run.download_pool, self.extractor._download_zipball,
+                        session, owner, repo, "HEAD", temp_dir
+                    )
+                finally:
+                    run.host_semaphores[host].release()
+            
+            # CPU-bound extraction overlaps with other repositories still downloading
+            result = await loop.run_in_executor(
+                run.extract_pool,
+                functools.partial(self.extractor.extract_from_folder, repo_folder, **extract_kwargs)
+            )
+            return {'url': repo_url, 'status': 'done', 'result': result, 'error': None,
+                    'elapsed': loop.time() - started}
+        except requests.Timeout:
+            return {'url': repo_url, 'status': 'failed', 'result': None,
+                    'error': "timed out waiting for GitHub",
+                    'elapsed': loop.time() - started}
+        except Exception as e:
+            return {'url': repo_url, 'status': 'failed', 'result': None, 'error': str(e),
+                    'elapsed': loop.time() - started}
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    async def iter_results(self, repo_urls: List[str], **extract_kwargs) -> AsyncIterator[Dict]:
+        """Yield one status dict per repository as soon as it finishes or fails"""
+        run = _BatchRun(self.max_concurrency, self.extract_workers)
+        
+        session = self.extractor._github_session(self.max_concurrency)
+        
+        tasks = [asyncio.ensure_future(self._extract_one(run, url, session, extract_kwargs))
+                 for url in dict.fromkeys(repo_urls)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # Let cancelled tasks run their own cleanup before the pools go away
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            
+            # Downloads already running in threads may still write into their temp dirs
+            loop = asyncio.get_running_loop()
+            for pool in (run.download_pool, run.extract_pool):
+                await loop.run_in_executor(None, pool.shutdown, True)
+            for temp_dir in run.temp_dirs:
+                shutil.rmtree(temp_dir, ignore_errors=True)
+            session.close()
+
+    def run(self, repo_urls: List[str], **extract_kwargs) -> List[Dict]:
+        """Blocking helper for headless use"""
+        async def collect():
+            return [item async for item in self.iter_results(repo_urls, **extract_kwargs)]
+        return asyncio.run(collect())
+
+def _run_batch_with_status(batch: BatchGitHubExtractor, repo_urls: List[str], placeholder,
+                           on_result: Optional[Callable[[str, Dict], None]] = None,
+                           **extract_kwargs) -> Dict[str, Dict]:
+    """Run a batch extraction while refreshing a live status table
+
+    on_result is called with each finished result as it arrives, e.g. to count it against memory budgets.
+    """
+    statuses = {url: {'Repository': url, 'Status': '⏳ pending', 'Files': '', 'Time (s)': ''}
+                for url in dict.fromkeys(repo_urls)}
+    results = {}
+    placeholder.table(list(statuses.values()))
+    
+    async def consume():
+        async for item in batch.iter_results(repo_urls, **extract_kwargs):
+            row = statuses[item['url']]
+            row['Time (s)'] = f"{item['elapsed']:.1f}"
+            if item['status'] == 'done':
+                row['Status'] = '✅ done'
+                row['Files'] = item['result']['file_count']
+                results[item['url']] = item['result']
+                if on_result is not None:
+                    on_result(item['url'], item['result'])
+            else:
+                row['Status'] = f"❌ {item['error']}"
+            placeholder.table(list(statuses.values()))
+    
+    asyncio.run(consume())
+    return results
+
+@st.cache_resource
+def _get_spill_manager() -> SpillManager:
+    """Process-wide manager shared by all browser sessions"""
+    return SpillManager(SESSION_MEMORY_BUDGET_BYTES, GLOBAL_MEMORY_BUDGET_BYTES, SPILL_SESSION_TTL_SECONDS)
+
+def _session_id() -> str:
+    if 'spill_session_id' not in st.session_state:
+        st.session_state['spill_session_id'] = uuid.uuid4().hex
+    return st.session_state['spill_session_id']
+
+def _selection_options(options: Optional[Dict]) -> Dict:
+    # Recorded license headers describe the content, not how files were selected
+    return {key: value for key, value in (options or {}).items() if key != 'license_headers'}
+
+def _register_exports(spill_manager: SpillManager, session_id: str, exports: Dict) -> Dict:
+    """Count finished exports against the session's memory budget"""
+    for label, exporter in exports.items():
+        spill_manager.register(session_id, f"export:{label}", exporter)
+    return exports
+
 def render_codextractr():
     """Render the CodeXtractR tool interface"""
     st.markdown("## 🔍 CodeXtractR - Code Extraction Tool")
     
+    spill_manager = _get_spill_manager()
+    session_id = _session_id()
+    spill_manager.touch(session_id)
+    
     # Create two columns
     col1, col2 = st.columns(2)
     
@@ -221,14 +783,22 @@ def render_codextractr():
         # Source selection
         source_type = st.radio(
             "Select source:",
-            ["Local Folder", "GitHub Repository"]
+            ["Local Folder", "GitHub Repository", "Multiple GitHub Repositories"]
         )
         
         if source_type == "Local Folder":
             folder_path = st.text_input("📂 Folder Path:", placeholder="Enter local folder path")
+        elif source_type == "Multiple GitHub Repositories":
+            repo_urls_text = st.text_area("🔗 GitHub Repository URLs (one per line):",
+                                          placeholder="https://github.com/user/repo1\nhttps://github.com/user/repo2")
+            max_concurrency = st.number_input("Concurrent downloads:", min_value=1, max_value=32, value=8)
         else:
             repo_url = st.text_input("🔗 GitHub Repository URL:", 
                                    placeholder="https://github.com/user/repo")
+            sparse = st.checkbox("Sparse fetch (download only matching files)")
+            include_patterns = ""
+            if sparse:
+                include_patterns = st.text_input("Include patterns:", placeholder="src/**/*.py, docs/*.md")
         
         # Settings
         st.markdown("### 🎛️ Settings")
@@ -236,10 +806,27 @@ def render_codextractr():
         include_binary = st.checkbox("Include binary files")
         custom_patterns = st.text_input("Additional ignore patterns:", 
                                       placeholder="*.log, temp/, cache/")
+        partial_large_files = st.checkbox("Partially extract oversized files (head/tail windows)")
+        partial_pattern = ""
+        if partial_large_files:
+            partial_pattern = st.text_input("Also show lines matching (regex):", placeholder="CREATE TABLE|def ")
+        transforms = st.multiselect("Compaction transforms:", list(TRANSFORMS.keys()))
+        is_batch = source_type == "Multiple GitHub Repositories"
+        export_formats = st.multiselect(
+            "Additional export formats:", list(EXPORT_FORMATS.keys()), disabled=is_batch,
+            help="Exports are not available for multi-repository extraction." if is_batch else None
+        )
         
         # Extract button
         if st.button("🚀 Extract Code", type="primary"):
             extractor = CodeExtractor()
+            # Never show the previous run's exports next to this run's outcome
+            for label, old_exporter in st.session_state.get('exports', {}).items():
+                spill_manager.release(session_id, f"export:{label}")
+                old_exporter.discard()
+            st.session_state['exports'] = {}
+            exporters = [] if is_batch else create_exporters(export_formats)
+            exports_finished = False
             
             try:
                 with st.spinner("Extracting code..."):
@@ -248,29 +835,84 @@ def render_codextractr():
                             st.error("Please provide a valid folder path!")
                         else:
                             result = extractor.extract_from_folder(
-                                folder_path, max_size, include_binary, custom_patterns
+                                folder_path, max_size, include_binary, custom_patterns, exporters,
+                                partial_large_files, partial_pattern, transforms
+                            )
+                            st.session_state['extraction_result'] = spill_manager.register(
+                                session_id, 'extraction_result', result
+                            )
+                            st.session_state['exports'] = _register_exports(
+                                spill_manager, session_id, finish_exporters(exporters)
                             )
-                            st.session_state['extraction_result'] = result
+                            exports_finished = True
                             st.session_state['source_type'] = 'local'
                             st.success(f"✅ Extracted {result['file_count']} files!")
+                    elif source_type == "Multiple GitHub Repositories":
+                        repo_urls = [u.strip() for u in repo_urls_text.splitlines() if u.strip()]
+                        if not repo_urls:
+                            st.error("Please provide at least one GitHub repository URL!")
+                        else:
+                            for old_url in st.session_state.get('batch_results') or {}:
+                                spill_manager.release(session_id, f"batch:{old_url}")
+                            st.session_state['batch_results'] = None
+                            batch = BatchGitHubExtractor(extractor, max_concurrency=int(max_concurrency))
+                            # Register each result on arrival so the budgets apply while the batch runs
+                            batch_results = _run_batch_with_status(
+                                batch, repo_urls, st.empty(),
+                                lambda url, batch_result: spill_manager.register(
+                                    session_id, f"batch:{url}", batch_result
+                                ),
+                                max_size_kb=max_size, include_binary=include_binary,
+                                custom_patterns=custom_patterns,
+                                partial_large_files=partial_large_files, partial_pattern=partial_pattern,
+                                transforms=transforms
+                            )
+                            st.session_state['batch_results'] = batch_results
+                            st.session_state['source_type'] = 'github_batch'
+                            if batch_results:
+                                first_url = next(iter(batch_results))
+                                st.session_state['extraction_result'] = batch_results[first_url]
+                            st.success(f"✅ Extracted {len(batch_results)} of {len(repo_urls)} repositories!")
                     else:
                         if not repo_url:
                             st.error("Please provide a GitHub repository URL!")
                         else:
                             result = extractor.extract_from_github(
-                                repo_url, max_size, include_binary, custom_patterns
+                                repo_url, max_size, include_binary, custom_patterns, exporters,
+                                sparse=sparse, include_patterns=include_patterns,
+                                partial_large_files=partial_large_files, partial_pattern=partial_pattern,
+                                transforms=transforms
+                            )
+                            st.session_state['extraction_result'] = spill_manager.register(
+                                session_id, 'extraction_result', result
                             )
-                            st.session_state['extraction_result'] = result
+                            st.session_state['exports'] = _register_exports(
+                                spill_manager, session_id, finish_exporters(exporters)
+                            )
+                            exports_finished = True
                             st.session_state['source_type'] = 'github'
                             st.success(f"✅ Extracted {result['file_count']} files from GitHub!")
             
             except Exception as e:
                 st.error(f"❌ Error: {str(e)}")
+            finally:
+                if not exports_finished:
+                    discard_exporters(exporters)
     
     with col2:
         st.markdown("### 📋 Extraction Results")
         
-        if 'extraction_result' in st.session_state:
+        # Repository picker for batch extractions
+        batch_results = st.session_state.get('batch_results')
+        if batch_results and st.session_state.get('source_type') == 'github_batch':
+            selected_repo = st.selectbox("Repository:", list(batch_results.keys()))
+            st.session_state['extraction_result'] = spill_manager.register(
+                session_id, 'extraction_result', batch_results[selected_repo]
+            )
+        
+        if st.session_state.get('extraction_result', {}).get('evicted'):
+            st.warning("⌛ This extraction expired after being idle. Please extract again.")
+        elif 'extraction_result' in st.session_state:
             result = st.session_state['extraction_result']
             
             # Metrics
@@ -280,6 +922,48 @@ def render_codextractr():
             with col_b:
                 st.metric("Files Skipped", result['skipped_count'])
             
+            # Compaction savings
+            savings = result.get('transform_savings')
+            if savings:
+                st.caption("🗜️ Compaction saved " + ", ".join(
+                    f"{format_file_size(saved)} ({name.lower()})" for name, saved in savings.items()
+                ))
+            
+            # Project metrics dashboard
+            metrics = result.get('metrics')
+            if metrics:
+                with st.expander("📊 Project Metrics"):
+                    col_m1, col_m2, col_m3 = st.columns(3)
+                    with col_m1:
+                        st.metric("Total Lines", f"{metrics['total_lines']:,}",
+                                  help=(f"{metrics['files_without_lines']} binary or windowed files are not counted"
+                                        if metrics.get('files_without_lines') else None))
+                    with col_m2:
+                        st.metric("Total Size", format_file_size(metrics['total_bytes']))
+                    with col_m3:
+                        st.metric("File Types", len(metrics['by_extension']))
+                    
+                    st.markdown("**By extension**")
+                    st.table([
+                        {'Extension': ext, 'Files': stats['files'], 'Lines': stats['lines'],
+                         'Size': format_file_size(stats['bytes'])}
+                        for ext, stats in metrics['by_extension'].items()
+                    ])
+                    
+                    st.markdown("**Largest files**")
+                    st.table([
+                        {'File': item['path'], 'Lines': item['lines'],
+                         'Size': format_file_size(item['bytes'])}
+                        for item in metrics['largest_files']
+                    ])
+                    
+                    st.markdown("**Heaviest directories**")
+                    st.table([
+                        {'Directory': directory, 'Files': stats['files'], 'Lines': stats['lines'],
+                         'Size': format_file_size(stats['bytes'])}
+                        for directory, stats in list(metrics['by_directory'].items())[:10]
+                    ])
+            
             # File explorer
             if result['file_contents']:
                 st.markdown("#### 📁 File Explorer")
@@ -316,7 +1000,7 @@ def render_codextractr():
                 if st.button("📋 Copy Entire Codebase"):
                     st.text_area(
                         "Complete codebase (select all and copy):",
-                        value=result['content'],
+                        value=str(result['content']),
                         height=200,
                         key="full_copy_area"
                     )
@@ -330,9 +1014,85 @@ def render_codextractr():
                     """, unsafe_allow_html=True)
             
             with col_z:
-                st.download_button(
-                    label="💾 Download as Text",
-                    data=result['content'],
-                    file_name="code_extract.txt",
-                    mime="text/plain"
-                )
+                # Downloads are only built on request, so reruns never decode a spilled extract
+                if st.button("💾 Prepare Text Download"):
+                    st.download_button(
+                        label="💾 Download as Text",
+                        data=str(result['content']),
+                        file_name="code_extract.txt",
+                        mime="text/plain"
+                    )
+            
+            # Structured exports
+            exports = {label: exporter for label, exporter in st.session_state.get('exports', {}).items()
+                       if not exporter.evicted}
+            if exports:
+                st.markdown("#### 📦 Exports")
+                export_cols = st.columns(len(exports))
+                for export_col, (label, exporter) in zip(export_cols, exports.items()):
+                    with export_col:
+                        if st.button(f"📦 Prepare {label}", key=f"prepare_export_{label}"):
+                            st.download_button(
+                                label=f"💾 {label}",
+                                data=exporter.getvalue(),
+                                file_name=exporter.file_name,
+                                mime=exporter.mime,
+                                key=f"export_{label}"
+                            )
+            elif st.session_state.get('exports'):
+                st.warning("⌛ These exports expired after being idle. Please extract again.")
+            
+            # Snapshot diffing
+            if result.get('manifest') is not None:
+                st.markdown("#### 🔀 Snapshot Diff")
+                col_s1, col_s2 = st.columns(2)
+                with col_s1:
+                    if st.button("📌 Set as Baseline"):
+                        st.session_state['baseline_snapshot'] = spill_manager.register(
+                            session_id, 'baseline', result
+                        )
+                        st.success("✅ Baseline snapshot saved!")
+                with col_s2:
+                    st.download_button(
+                        label="💾 Download Manifest",
+                        data=manifest_to_json(result['manifest'], result.get('manifest_options')),
+                        file_name="code_manifest.json",
+                        mime="application/json"
+                    )
+                
+                uploaded_manifest = st.file_uploader("Or compare against a saved manifest:", type=["json"])
+                if uploaded_manifest is not None:
+                    try:
+                        manifest, options = manifest_from_json(uploaded_manifest.getvalue().decode('utf-8'))
+                        baseline = {'manifest': manifest, 'manifest_options': options, 'file_contents': None}
+                    except Exception as e:
+                        baseline = None
+                        st.error(f"❌ Invalid manifest: {str(e)}")
+                else:
+                    baseline = st.session_state.get('baseline_snapshot')
+                
+                if baseline:
+                    baseline_options = _selection_options(baseline.get('manifest_options'))
+                    if baseline_options != _selection_options(result.get('manifest_options')):
+                        st.warning("⚠️ The baseline was extracted with different options, "
+                                   "so files may show up as added or removed because of the filters.")
+                    changes = diff_snapshots(baseline['manifest'], result['manifest'],
+                                             baseline['file_contents'], result['file_contents'])
+                    col_d1, col_d2, col_d3 = st.columns(3)
+                    with col_d1:
+                        st.metric("Added", len(changes['added']))
+                    with col_d2:
+                        st.metric("Removed", len(changes['removed']))
+                    with col_d3:
+                        st.metric("Modified", len(changes['modified']))
+                    
+                    for path in changes['added']:
+                        st.text(f"➕ {path}")
+                    for path in changes['removed']:
+                        st.text(f"➖ {path}")
+                    for path in changes['modified']:
+                        with st.expander(f"✏️ {path}"):
+                            if path in changes['diffs']:
+                                st.code(changes['diffs'][path], language="diff")
+                            else:
+                                st.info("Baseline content not available for this file.")
@@ -0,0 +1,203 @@
+import gzip
+import io
+import json
+import lzma
+import struct
+import tempfile
+import zipfile
+import zlib
+from typing import BinaryIO, Dict, List
+
+# Exports stay in memory up to this size, then spill to a temp file
+SPOOL_MAX_BYTES = 8 * 1024 * 1024
+
+# Indexed bundle layout:
+#   MAGIC | blob | blob | ... | JSON index | trailer
+# The trailer is struct TRAILER_FORMAT: (index offset, index length, MAGIC)
+BUNDLE_MAGIC = b'CHPK0001'
+TRAILER_FORMAT = '<QQ8s'
+TRAILER_SIZE = struct.calcsize(TRAILER_FORMAT)
+
+
+class BaseExporter:
+    """Incrementally write extracted files into a spooled output buffer"""
+    label = ""
+    file_name = ""
+    mime = "application/octet-stream"
+
+    def __init__(self):
+        self.buffer = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+        self.closed = False
+        self.evicted = False
+        self.spilled = False
+        # Size of the finished export, recorded by close()
+        self.size = 0
+
+    def add_file(self, path: str, content: str):
+        raise NotImplementedError
+
+    def _finish(self):
+        pass
+
+    def close(self) -> BinaryIO:
+        """Finalize the export and rewind its buffer"""
+        if not self.closed:
+            self._finish()
+            self.closed = True
+            self.buffer.seek(0, io.SEEK_END)
+            self.size = self.buffer.tell()
+        self.buffer.seek(0)
+        return self.buffer
+
+    def discard(self):
+        """Drop an export and release its spooled buffer"""
+        if self.buffer.closed:
+            return
+        self.close()
+        self.buffer.close()
+
+    def memory_size(self) -> int:
+        """Bytes held in memory by a finished export whose buffer has not rolled over to disk"""
+        # Past SPOOL_MAX_BYTES the spooled buffer has already rolled over on its own
+        if self.evicted or self.spilled or self.size > SPOOL_MAX_BYTES:
+            return 0
+        return self.size
+
+    def spill(self):
+        """Move a finished export to its temp file, keeping it downloadable"""
+        if not self.evicted:
+            self.buffer.rollover()
+            self.spilled = True
+
+    def evict(self):
+        self.discard()
+        self.evicted = True
+
+    def getvalue(self) -> bytes:
+        """Return the finished (compressed) export as bytes"""
+        self.close()
+        data = self.buffer.read()
+        self.buffer.seek(0)
+        return data
+
+
+class JsonlExporter(BaseExporter):
+    """One JSON record per file, optionally gzip or xz compressed"""
+    openers = {
+        None: lambda fileobj: fileobj,
+        'gzip': lambda fileobj: gzip.GzipFile(fileobj=fileobj, mode='wb'),
+        'xz': lambda fileobj: lzma.LZMAFile(fileobj, mode='wb'),
+    }
+    suffixes = {None: '', 'gzip': '.gz', 'xz': '.xz'}
+    mimes = {None: 'application/jsonl', 'gzip': 'application/gzip', 'xz': 'application/x-xz'}
+
+    def __init__(self, compression: str = None):
+        super().__init__()
+        if compression not in self.openers:
+            raise ValueError(f"Unsupported compression: {compression}")
+        self.compression = compression
+        self.stream = self.openers[compression](self.buffer)
+        self.label = "JSONL" + (f" ({compression})" if compression else "")
+        self.file_name = "code_extract.jsonl" + self.suffixes[compression]
+        self.mime = self.mimes[compression]
+
+    def add_file(self, path: str, content: str):
+        data = content.encode('utf-8')
+        record = {'path': path, 'size': len(data), 'content': content}
+        self.stream.write(json.dumps(record, ensure_ascii=False).encode('utf-8'))
+        self.stream.write(b'\n')
+
+    def _finish(self):
+        if self.stream is not self.buffer:
+            self.stream.close()
+
+
+class ZipExporter(BaseExporter):
+    """Zip archive that recreates the extracted project layout"""
+    label = "ZIP"
+    file_name = "code_extract.zip"
+    mime = "application/zip"
+
+    def __init__(self):
+        super().__init__()
+        self.archive = zipfile.ZipFile(self.buffer, 'w', compression=zipfile.ZIP_DEFLATED)
+
+    def add_file(self, path: str, content: str):
+        self.archive.writestr(path.replace('\\', '/'), content)
+
+    def _finish(self):
+        self.archive.close()
+
+
+class IndexedBundleExporter(BaseExporter):
+    """Per-file zlib blobs followed by a byte-offset index for random access"""
+    label = "Indexed bundle"
+    file_name = "code_extract.chpk"
+
+    def __init__(self, level: int = 6):
+        super().__init__()
+        self.level = level
+        self.index = {}
+        self.offset = len(BUNDLE_MAGIC)
+        self.buffer.write(BUNDLE_MAGIC)
+
+    def add_file(self, path: str, content: str):
+        data = content.encode('utf-8')
+        blob = zlib.compress(data, self.level)
+        self.buffer.write(blob)
+        self.index[path] = {'offset': self.offset, 'length': len(blob), 'size': len(data)}
+        self.offset += len(blob)
+
+    def _finish(self):
+        index_data = json.dumps(self.index, ensure_ascii=False).encode('utf-8')
+        self.buffer.write(index_data)
+        self.buffer.write(struct.pack(TRAILER_FORMAT, self.offset, len(index_data), BUNDLE_MAGIC))
+
+
+class IndexedBundleReader:
+    """Seek straight to single files inside an indexed bundle"""
+
+    def __init__(self, fileobj: BinaryIO):
+        self.fileobj = fileobj
+        self.fileobj.seek(-TRAILER_SIZE, io.SEEK_END)
+        index_offset, index_length, magic = struct.unpack(TRAILER_FORMAT, self.fileobj.read(TRAILER_SIZE))
+        if magic != BUNDLE_MAGIC:
+            raise ValueError("Not a CodeHarvest indexed bundle")
+        self.fileobj.seek(index_offset)
+        self.index = json.loads(self.fileobj.read(index_length).decode('utf-8'))
+
+    def paths(self) -> List[str]:
+        return list(self.index.keys())
+
+    def read(self, path: str) -> str:
+        entry = self.index[path]
+        self.fileobj.seek(entry['offset'])
+        return zlib.decompress(self.fileobj.read(entry['length'])).decode('utf-8')
+
+
+EXPORT_FORMATS = {
+    "JSONL": lambda: JsonlExporter(),
+    "JSONL (gzip)": lambda: JsonlExporter('gzip'),
+    "JSONL (xz)": lambda: JsonlExporter('xz'),
+    "ZIP": lambda: ZipExporter(),
+    "Indexed bundle": lambda: IndexedBundleExporter(),
+}
+
+
+def create_exporters(formats: List[str]) -> List[BaseExporter]:
+    """Instantiate exporters for the selected format labels"""
+    return [EXPORT_FORMATS[name]() for name in formats if name in EXPORT_FORMATS]
+
+
+def discard_exporters(exporters: List[BaseExporter]):
+    for exporter in exporters:
+        exporter.discard()
+
+
+def finish_exporters(exporters: List[BaseExporter]) -> Dict[str, BaseExporter]:
+    """Close all exporters and key them by label for the download UI"""
+    finished = {}
+    for exporter in exporters:
+        exporter.close()
+        finished[exporter.label] = exporter
+    return finished
@@ -4,9 +4,10 @@ def copy_to_clipboard(text: str) -> bool:
     """Copy text to clipboard using JavaScript"""
     try:
         # Use Streamlit's built-in clipboard functionality
+        escaped_text = text.replace('`', '\\`')
         st.write(f"""
         <script>
-        navigator.clipboard.writeText(`{text.replace('`', '\\`')}`).then(function() {{
+        navigator.clipboard.writeText(`{escaped_text}`).then(function() {{
             console.log('Text copied to clipboard');
         }});
         </script>
@@ -0,0 +1,70 @@
+import heapq
+import os
+from typing import Dict, Optional, Set
+
+
+class MetricsCollector:
+    """Accumulate project metrics while files are being extracted"""
+
+    def __init__(self, code_extensions: Set[str], top_n: int = 10):
+        self.code_extensions = code_extensions
+        self.top_n = top_n
+        self.total_files = 0
+        self.total_lines = 0
+        self.total_bytes = 0
+        # Binary placeholders and windowed files have no meaningful line count
+        self.files_without_lines = 0
+        self.by_extension = {}
+        self.by_directory = {}
+        self.largest = []
+
+    def add_file(self, path: str, size_bytes: int, lines: Optional[int] = None):
+        """Record a file's on-disk size and, when known, its on-disk line count"""
+        if lines is None:
+            self.files_without_lines += 1
+        line_count = lines or 0
+        ext = os.path.splitext(path)[1].lower()
+        group = ext if ext in self.code_extensions else 'other'
+
+        self.total_files += 1
+        self.total_lines += line_count
+        self.total_bytes += size_bytes
+
+        stats = self.by_extension.setdefault(group, {'files': 0, 'lines': 0, 'bytes': 0})
+        stats['files'] += 1
+        stats['lines'] += line_count
+        stats['bytes'] += size_bytes
+
+        # Roll the file up into every ancestor directory
+        directory = os.path.dirname(path)
+        while True:
+            key = directory or '.'
+            weight = self.by_directory.setdefault(key, {'files': 0, 'lines': 0, 'bytes': 0})
+            weight['files'] += 1
+            weight['lines'] += line_count
+            weight['bytes'] += size_bytes
+            if not directory:
+                break
+            directory = os.path.dirname(directory)
+
+        entry = (size_bytes, path, lines)
+        if len(self.largest) < self.top_n:
+            heapq.heappush(self.largest, entry)
+        elif entry > self.largest[0]:
+            heapq.heapreplace(self.largest, entry)
+
+    def summary(self) -> Dict:
+        """Return the collected metrics as plain, sorted structures"""
+        by_bytes = lambda item: item[1]['bytes']
+        return {
+            'total_files': self.total_files,
+            'total_lines': self.total_lines,
+            'total_bytes': self.total_bytes,
+            'files_without_lines': self.files_without_lines,
+            'by_extension': dict(sorted(self.by_extension.items(), key=by_bytes, reverse=True)),
+            'by_directory': dict(sorted(self.by_directory.items(), key=by_bytes, reverse=True)),
+            'largest_files': [
+                {'path': path, 'bytes': size, 'lines': lines}
+                for size, path, lines in sorted(self.largest, reverse=True)
+            ]
+        }
@@ -0,0 +1,108 @@
+import difflib
+import hashlib
+import io
+import json
+from typing import Dict, List, Mapping, Optional, Tuple
+
+# Version 2 hashes the raw file bytes and records the extraction options
+MANIFEST_VERSION = 2
+HASH_CHUNK_BYTES = 1024 * 1024
+
+
+def _new_hasher():
+    return hashlib.blake2b(digest_size=16)
+
+
+def file_hash(file_path: str) -> str:
+    """Hash a file's raw bytes in chunks"""
+    hasher = _new_hasher()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+class HashingReader(io.RawIOBase):
+    """Raw reader that hashes every byte read through it, so text decoding and hashing share one pass"""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.hasher = _new_hasher()
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        count = self.raw.readinto(buffer)
+        if count:
+            self.hasher.update(memoryview(buffer)[:count])
+        return count
+
+    def hexdigest(self) -> str:
+        """Hash any bytes not consumed yet, then return the digest of the whole file"""
+        for chunk in iter(lambda: self.raw.read(HASH_CHUNK_BYTES), b''):
+            self.hasher.update(chunk)
+        return self.hasher.hexdigest()
+
+
+def manifest_to_json(manifest: Dict, options: Optional[Dict] = None) -> str:
+    return json.dumps({'version': MANIFEST_VERSION, 'options': options or {}, 'files': manifest},
+                      indent=1, sort_keys=True)
+
+
+def save_manifest(manifest: Dict, path: str, options: Optional[Dict] = None):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(manifest_to_json(manifest, options))
+
+
+def load_manifest(path: str) -> Tuple[Dict, Dict]:
+    with open(path, 'r', encoding='utf-8') as f:
+        return manifest_from_json(f.read())
+
+
+def manifest_from_json(data: str) -> Tuple[Dict, Dict]:
+    """Return the (files, extraction options) stored in a manifest"""
+    loaded = json.loads(data)
+    if loaded.get('version') != MANIFEST_VERSION:
+        raise ValueError("Unsupported manifest version")
+    return loaded['files'], loaded.get('options', {})
+
+
+def diff_manifests(old: Dict, new: Dict) -> Dict[str, List[str]]:
+    """Compare two manifests by path, size and hash without touching file contents"""
+    added = [path for path in new if path not in old]
+    removed = [path for path in old if path not in new]
+    modified = [
+        path for path, entry in new.items()
+        if path in old and (old[path]['size'] != entry['size'] or old[path]['hash'] != entry['hash'])
+    ]
+    return {'added': sorted(added), 'removed': sorted(removed), 'modified': sorted(modified)}
+
+
+def diff_snapshots(old_manifest: Dict, new_manifest: Dict,
+                   old_contents: Optional[Mapping[str, str]] = None,
+                   new_contents: Optional[Mapping[str, str]] = None,
+                   context_lines: int = 3, changes: Optional[Dict[str, List[str]]] = None) -> Dict:
+    """Return added/removed/modified paths plus unified diffs where both contents are known
+
+    changes may pass in an already computed diff_manifests() result.
+    """
+    changes = dict(changes) if changes is not None else diff_manifests(old_manifest, new_manifest)
+    diffs = {}
+
+    # Only modified files are ever loaded, so unchanged content is never compared
+    for path in changes['modified']:
+        if old_contents is None or new_contents is None:
+            continue
+        if path not in old_contents or path not in new_contents:
+            continue
+        diffs[path] = "".join(difflib.unified_diff(
+            old_contents[path].splitlines(keepends=True),
+            new_contents[path].splitlines(keepends=True),
+            fromfile=f"a/{path}",
+            tofile=f"b/{path}",
+            n=context_lines
+        ))
+
+    changes['diffs'] = diffs
+    return changes
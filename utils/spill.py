@@ -0,0 +1,218 @@
+import mmap
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Mapping
+from typing import Dict, Iterator
+
+
+class _SpillFile:
+    """Append-only temp file that is memory-mapped read-only once sealed
+
+    Sealing closes the file, so each spill file holds a single descriptor (the map's).
+    """
+
+    def __init__(self):
+        self.file = tempfile.TemporaryFile()
+        self.size = 0
+        self.map = None
+
+    def append(self, data: bytes) -> int:
+        offset = self.size
+        self.file.write(data)
+        self.size += len(data)
+        return offset
+
+    def seal(self):
+        self.file.flush()
+        if self.size:
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        # The map holds its own descriptor, so the file's can go; the unlinked data lives until unmapped
+        self.file.close()
+
+    def read(self, offset: int, length: int) -> bytes:
+        if self.map is None:
+            return b''
+        return self.map[offset:offset + length]
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+        self.file.close()
+
+
+class SpilledFileContents(Mapping):
+    """Read-only path -> content mapping backed by a memory-mapped temp file"""
+
+    def __init__(self, file_contents: Dict[str, str]):
+        self._spill = _SpillFile()
+        self._index = {}
+        for path, content in file_contents.items():
+            data = content.encode('utf-8')
+            self._index[path] = (self._spill.append(data), len(data))
+        self._spill.seal()
+
+    def __getitem__(self, path: str) -> str:
+        offset, length = self._index[path]
+        return self._spill.read(offset, length).decode('utf-8')
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._index)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, path) -> bool:
+        return path in self._index
+
+    def close(self):
+        self._spill.close()
+
+
+class SpilledText:
+    """Large string kept on disk and only decoded when converted with str()"""
+
+    def __init__(self, text: str):
+        self._spill = _SpillFile()
+        self._length = len(text)
+        self._spill.append(text.encode('utf-8'))
+        self._spill.seal()
+
+    def __str__(self) -> str:
+        return self._spill.read(0, self._spill.size).decode('utf-8')
+
+    def __len__(self) -> int:
+        return self._length
+
+    def close(self):
+        self._spill.close()
+
+
+def is_spilled(result: Dict) -> bool:
+    return isinstance(result.get('file_contents'), SpilledFileContents)
+
+
+# Besides result dicts, the manager tracks any object exposing memory_size(), spill() and evict()
+def _is_spillable(item) -> bool:
+    return not isinstance(item, dict) and hasattr(item, 'spill')
+
+
+def result_memory_size(result: Dict) -> int:
+    """Approximate bytes pinned in memory by an extraction result"""
+    if _is_spillable(result):
+        return result.memory_size()
+    if is_spilled(result):
+        return 0
+    size = len(result.get('content', ''))
+    size += sum(len(path) + len(content) for path, content in result.get('file_contents', {}).items())
+    return size
+
+
+def spill_result(result: Dict):
+    """Move a result's content and file contents to disk, in place"""
+    if _is_spillable(result):
+        result.spill()
+        return
+    if is_spilled(result):
+        return
+    result['file_contents'] = SpilledFileContents(result.get('file_contents', {}))
+    result['content'] = SpilledText(result.get('content', ''))
+
+
+def evict_result(result: Dict):
+    """Release a result's spilled data and mark it as expired, in place"""
+    if _is_spillable(result):
+        result.evict()
+        return
+    for key in ('file_contents', 'content'):
+        value = result.get(key)
+        if isinstance(value, (SpilledFileContents, SpilledText)):
+            value.close()
+    result['file_contents'] = {}
+    result['content'] = ""
+    result['evicted'] = True
+
+
+class SpillManager:
+    """Track extraction results and exports per session and spill them to disk past the memory budgets"""
+
+    def __init__(self, session_budget_bytes: int, global_budget_bytes: int, ttl_seconds: float):
+        self.session_budget_bytes = session_budget_bytes
+        self.global_budget_bytes = global_budget_bytes
+        self.ttl_seconds = ttl_seconds
+        # Ordered from least to most recently used session
+        self.sessions = OrderedDict()
+        self.lock = threading.RLock()
+
+    def _session(self, session_id: str) -> Dict:
+        session = self.sessions.get(session_id)
+        if session is None:
+            session = {'results': {}, 'last_access': time.time()}
+            self.sessions[session_id] = session
+        session['last_access'] = time.time()
+        self.sessions.move_to_end(session_id)
+        return session
+
+    def _unique_results(self, session: Dict) -> Dict[int, Dict]:
+        # The same result can be registered under several keys (e.g. current and baseline)
+        return {id(result): result for result in session['results'].values()}
+
+    def _session_memory(self, session: Dict) -> int:
+        return sum(result_memory_size(result) for result in self._unique_results(session).values())
+
+    def memory_usage(self) -> int:
+        with self.lock:
+            return sum(self._session_memory(session) for session in self.sessions.values())
+
+    def touch(self, session_id: str):
+        """Mark a session as active and evict sessions idle past the TTL"""
+        with self.lock:
+            self._session(session_id)
+            self._evict_expired()
+
+    def register(self, session_id: str, key: str, result: Dict) -> Dict:
+        """Track a result held in a session's state, spilling it if budgets are exceeded"""
+        with self.lock:
+            session = self._session(session_id)
+            session['results'][key] = result
+            self._evict_expired()
+            self._enforce_budgets(session_id)
+        return result
+
+    def release(self, session_id: str, key: str):
+        with self.lock:
+            session = self.sessions.get(session_id)
+            if session is not None:
+                session['results'].pop(key, None)
+
+    def _evict_expired(self):
+        cutoff = time.time() - self.ttl_seconds
+        expired = [sid for sid, session in self.sessions.items() if session['last_access'] < cutoff]
+        for session_id in expired:
+            for result in self._unique_results(self.sessions.pop(session_id)).values():
+                evict_result(result)
+
+    def _spill_largest_first(self, session: Dict, budget: int, total: int) -> int:
+        results = sorted(self._unique_results(session).values(), key=result_memory_size, reverse=True)
+        for result in results:
+            if total <= budget:
+                break
+            total -= result_memory_size(result)
+            spill_result(result)
+        return total
+
+    def _enforce_budgets(self, current_session_id: str):
+        current = self.sessions[current_session_id]
+        self._spill_largest_first(current, self.session_budget_bytes, self._session_memory(current))
+
+        # Spill least recently used sessions first; the current one is last in order
+        total = self.memory_usage()
+        for session in list(self.sessions.values()):
+            if total <= self.global_budget_bytes:
+                break
+            session_memory = self._session_memory(session)
+            excess = total - self.global_budget_bytes
+            remaining = self._spill_largest_first(session, max(session_memory - excess, 0), session_memory)
+            total -= session_memory - remaining
@@ -0,0 +1,416 @@
+import hashlib
+import itertools
+import os
+import re
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+
+class _CommentSyntax:
+    """Comment and string delimiters for one language, compiled into a single opener regex
+
+    strings holds (open, close, multiline, escapable) tuples. Languages are only listed when
+    every string form that can span lines is covered here, so no comment marker inside one is
+    ever mistaken for a comment.
+    """
+
+    def __init__(self, line: str = "", block: Tuple[str, str] = None, strings: Tuple = (),
+                 raw_string: str = "", char_prefix: str = "", continuation: bool = False,
+                 regex_literals: bool = False):
+        self.line = line
+        self.block = block
+        self.strings = {opener: (close, multiline, escapable) for opener, close, multiline, escapable in strings}
+        # raw_string captures a delimiter that is repeated in the closer, as in C++ R"tag(...)tag"
+        self.raw_string = raw_string
+        # A character literal prefix (Erlang $") quotes the character that follows it
+        self.char_prefix = char_prefix
+        # C and C++ continue line comments onto the next line after a trailing backslash
+        self.continuation = continuation
+        # JavaScript regex literals may contain "/*" or quotes, so they are skipped like strings
+        self.regex_literals = regex_literals
+
+        tokens = [line, block[0] if block else "", char_prefix, '/' if regex_literals else "", *self.strings]
+        tokens = [token for token in tokens if token]
+        alternatives = [re.escape(token) for token in sorted(tokens, key=len, reverse=True)]
+        if raw_string:
+            alternatives.insert(0, raw_string)
+        self.opener = re.compile("|".join(alternatives))
+
+
+_QUOTES = (('"', '"', False, True), ("'", "'", False, True))
+_C = _CommentSyntax('//', ('/*', '*/'), _QUOTES, continuation=True)
+_CPP = _CommentSyntax('//', ('/*', '*/'), _QUOTES, raw_string=r'R"([^()\\\s]{0,16})\(', continuation=True)
+_TRIPLE_QUOTED = _CommentSyntax('//', ('/*', '*/'), (('"""', '"""', True, True),) + _QUOTES)
+_CSS = _CommentSyntax('', ('/*', '*/'), _QUOTES)
+_CSS_PREPROCESSOR = _CommentSyntax('//', ('/*', '*/'), _QUOTES)
+
+COMMENT_SYNTAX = {
+    '.py': _CommentSyntax('#', None, (('"""', '"""', True, True), ("'''", "'''", True, True)) + _QUOTES),
+    '.toml': _CommentSyntax('#', None, (('"""', '"""', True, True), ("'''", "'''", True, False),
+                                        ('"', '"', False, True), ("'", "'", False, False))),
+    '.r': _CommentSyntax('#', None, (('"', '"', True, True), ("'", "'", True, True))),
+    '.ini': _CommentSyntax('#'),
+    '.cfg': _CommentSyntax('#'),
+    '.js': _CommentSyntax('//', ('/*', '*/'), (('`', '`', True, True),) + _QUOTES, regex_literals=True),
+    '.c': _C,
+    '.h': _CPP,
+    '.cpp': _CPP,
+    '.hpp': _CPP,
+    '.java': _TRIPLE_QUOTED,
+    '.kt': _CommentSyntax('//', ('/*', '*/'), (('"""', '"""', True, False),) + _QUOTES),
+    '.cs': _CommentSyntax('//', ('/*', '*/'), (('"""', '"""', True, False), ('@$"', '"', True, False),
+                                               ('$@"', '"', True, False), ('@"', '"', True, False)) + _QUOTES),
+    '.go': _CommentSyntax('//', ('/*', '*/'), (('`', '`', True, False),) + _QUOTES),
+    # Rust strings may span lines; lifetimes make "'" unreliable, so it only quotes within a line
+    '.rs': _CommentSyntax('//', ('/*', '*/'), (('r##"', '"##', True, False), ('r#"', '"#', True, False),
+                                               ('r"', '"', True, False), ('"', '"', True, True),
+                                               ("'", "'", False, True))),
+    '.swift': _TRIPLE_QUOTED,
+    '.dart': _CommentSyntax('//', ('/*', '*/'), (('"""', '"""', True, True), ("'''", "'''", True, True))
+                            + _QUOTES),
+    '.css': _CSS,
+    '.scss': _CSS_PREPROCESSOR,
+    '.less': _CSS_PREPROCESSOR,
+    '.sql': _CommentSyntax('--', ('/*', '*/'), (('$$', '$$', True, False), ("'", "'", True, False),
+                                                ('"', '"', True, False))),
+    '.elm': _CommentSyntax('--', ('{-', '-}'), (('"""', '"""', True, True), ('"', '"', False, True))),
+    '.erl': _CommentSyntax('%', None, (('"', '"', True, True),), char_prefix='$'),
+}
+for _ext in ('.jsx', '.ts', '.tsx'):
+    COMMENT_SYNTAX[_ext] = COMMENT_SYNTAX['.js']
+COMMENT_SYNTAX['.scala'] = COMMENT_SYNTAX['.kt']
+LOCKFILE_NAMES = {
+    'package-lock.json', 'npm-shrinkwrap.json', 'composer.lock', 'pipfile.lock',
+    'pnpm-lock.yaml', 'pubspec.lock'
+}
+# License headers are only looked for in the first lines of a file
+LICENSE_SCAN_LINES = 60
+
+
+def _byte_len(line: str) -> int:
+    return len(line) if line.isascii() else len(line.encode('utf-8'))
+
+
+# A "/" after one of these characters or keywords starts a regex literal rather than a division
+_REGEX_PRECEDING_CHARS = set('(,=:[!&|?{};+-*%>~^')
+_REGEX_PRECEDING_WORD = re.compile(r'(?:^|[^\w$])(?:return|typeof|case|do|else|in|of|void|yield|await|'
+                                   r'delete|throw|new)$')
+
+
+def _starts_regex(text: str, index: int) -> bool:
+    before = text[:index].rstrip()
+    return not before or before[-1] in _REGEX_PRECEDING_CHARS or bool(_REGEX_PRECEDING_WORD.search(before))
+
+
+def _skip_regex(text: str, start: int) -> int:
+    """Return the index just past a regex literal's closing "/", or -1 if the line ends first"""
+    in_class = False
+    index = start
+    while index < len(text):
+        char = text[index]
+        if char == '\\':
+            index += 1
+        elif char == '[':
+            in_class = True
+        elif char == ']':
+            in_class = False
+        elif char == '/' and not in_class:
+            return index + 1
+        index += 1
+    return -1
+
+
+def _find_close(text: str, start: int, close: str, escapable: bool) -> int:
+    """Return the index just past the closing delimiter, or -1 if the line ends first"""
+    while True:
+        index = text.find(close, start)
+        if index == -1:
+            return -1
+        backslashes = 0
+        while escapable and index - backslashes > start and text[index - backslashes - 1] == '\\':
+            backslashes += 1
+        if backslashes % 2 == 0:
+            return index + len(close)
+        start = index + 1
+
+
+class BaseTransform:
+    """Line-streaming transform that records how many bytes it removed"""
+    name = ""
+
+    def __init__(self):
+        self.bytes_saved = 0
+
+    def applies_to(self, path: str) -> bool:
+        return True
+
+    def transform(self, lines: Iterable[str], path: str) -> Iterator[str]:
+        raise NotImplementedError
+
+    def apply(self, lines: Iterable[str], path: str) -> Iterator[str]:
+        """Wrap transform() with byte accounting on both sides"""
+        bytes_in = 0
+
+        def counted(source):
+            nonlocal bytes_in
+            for line in source:
+                bytes_in += _byte_len(line)
+                yield line
+
+        bytes_out = 0
+        for line in self.transform(counted(lines), path):
+            bytes_out += _byte_len(line)
+            yield line
+        self.bytes_saved += bytes_in - bytes_out
+
+
+class TrailingWhitespaceTransform(BaseTransform):
+    name = "Trailing whitespace"
+
+    def transform(self, lines, path):
+        for line in lines:
+            stripped = line.rstrip()
+            yield stripped + '\n' if line.endswith('\n') else stripped
+
+
+class BlankLineRunTransform(BaseTransform):
+    name = "Blank line runs"
+
+    def transform(self, lines, path):
+        previous_blank = False
+        for line in lines:
+            blank = not line.strip()
+            if blank and previous_blank:
+                continue
+            previous_blank = blank
+            yield line
+
+
+class CommentStripTransform(BaseTransform):
+    """Drop comment-only lines and comment banners, keeping shebangs
+
+    Lines are scanned with the string and block-comment state carried over from the previous
+    line, so markers inside multi-line strings stay. Comments sharing a line with code are kept,
+    except the part of a multi-line block comment that opens or closes on that line.
+    """
+    name = "Comments"
+
+    def applies_to(self, path):
+        return os.path.splitext(path)[1].lower() in COMMENT_SYNTAX
+
+    def _scan(self, syntax: _CommentSyntax, text: str, state):
+        """Return (has_code, has_comment, code_start, code_end, state) for one line without its newline"""
+        has_code = has_comment = False
+        code_start, code_end = 0, len(text)
+        index = 0
+
+        if state is not None:
+            kind, close, multiline, escapable = state
+            if kind == 'line':
+                state = ('line', None, False, False) if text.endswith('\\') else None
+                return False, True, 0, len(text), state
+            end = _find_close(text, 0, close, escapable)
+            if kind == 'block':
+                has_comment = True
+                if end == -1:
+                    return False, True, 0, len(text), state
+                code_start = end
+            else:
+                has_code = True
+                if end == -1:
+                    if not multiline and not text.endswith('\\'):
+                        state = None
+                    return True, False, 0, len(text), state
+            index, state = end, None
+
+        while True:
+            match = syntax.opener.search(text, index)
+            if text[index:match.start() if match else len(text)].strip():
+                has_code = True
+            if match is None:
+                break
+            token = match.group()
+            if token == syntax.line:
+                has_comment = True
+                if syntax.continuation and text.endswith('\\'):
+                    state = ('line', None, False, False)
+                # Inline comments after code are left alone
+                break
+            if token == '/' and syntax.regex_literals:
+                has_code = True
+                end = _skip_regex(text, match.end()) if _starts_regex(text, match.start()) else -1
+                # A division, or a "/" that never closes on this line, is ordinary code
+                index = match.end() if end == -1 else end
+                continue
+            if token == syntax.char_prefix:
+                has_code = True
+                index = match.end() + 1
+                continue
+            if syntax.block and token == syntax.block[0]:
+                has_comment = True
+                end = _find_close(text, match.end(), syntax.block[1], False)
+                if end == -1:
+                    state = ('block', syntax.block[1], True, False)
+                    code_end = match.start()
+                    break
+                index = end
+                continue
+            has_code = True
+            if token in syntax.strings:
+                close, multiline, escapable = syntax.strings[token]
+            else:
+                close, multiline, escapable = ')' + match.group(1) + '"', True, False
+            end = _find_close(text, match.end(), close, escapable)
+            if end == -1:
+                if multiline or (escapable and text.endswith('\\')):
+                    state = ('string', close, multiline, escapable)
+                break
+            index = end
+        return has_code, has_comment, code_start, code_end, state
+
+    def transform(self, lines, path):
+        syntax = COMMENT_SYNTAX[os.path.splitext(path)[1].lower()]
+        state = None
+
+        for number, line in enumerate(lines):
+            if number == 0 and line.startswith('#!'):
+                yield line
+                continue
+            newline = '\n' if line.endswith('\n') else ''
+            text = line[:-1] if newline else line
+            has_code, has_comment, code_start, code_end, state = self._scan(syntax, text, state)
+            if not has_code:
+                if not has_comment:
+                    yield line
+                continue
+            if code_start == 0 and code_end == len(text):
+                yield line
+                continue
+            # Cut the part of a multi-line block comment that closes or opens on this line
+            # A line that opens inside a comment has no code indentation of its own
+            indent = "" if code_start else text[:len(text) - len(text.lstrip())]
+            yield indent + text[code_start:code_end].strip() + newline
+
+
+class LicenseHeaderTransform(BaseTransform):
+    """Keep the first copy of each license header and drop later duplicates"""
+    name = "Duplicate license headers"
+
+    def __init__(self):
+        super().__init__()
+        # Header digest (hex) -> path of the file that kept it
+        self.seen_headers = {}
+
+    def seed(self, header_owners: Dict[str, str], path: str):
+        """Replay an earlier extraction's dedupe decisions for a single re-read file"""
+        self.seen_headers.update((digest, owner) for digest, owner in header_owners.items() if owner != path)
+
+    def transform(self, lines, path):
+        lines = iter(lines)
+        header = []
+
+        # A shebang is always kept and never part of the header, so files differing only there still dedupe
+        first = next(lines, None)
+        if first is None:
+            return
+        if first.startswith('#!'):
+            yield first
+        else:
+            lines = itertools.chain([first], lines)
+
+        # Buffer only the leading comment block, bounded by LICENSE_SCAN_LINES
+        for line in lines:
+            stripped = line.strip()
+            is_comment = (not stripped or stripped.startswith(('#', '//', '/*', '*', '--', ';', '%', '<!--'))
+                          or stripped.endswith(('*/', '-->')))
+            if not is_comment or len(header) >= LICENSE_SCAN_LINES:
+                header_text = "".join(header)
+                lowered = header_text.lower()
+                if header and ('license' in lowered or 'copyright' in lowered):
+                    digest = hashlib.blake2b(header_text.strip().encode('utf-8'), digest_size=16).hexdigest()
+                    if digest in self.seen_headers:
+                        header = []
+                    else:
+                        self.seen_headers[digest] = path
+                yield from header
+                yield line
+                break
+            header.append(line)
+        else:
+            yield from header
+            return
+
+        yield from lines
+
+
+class LockfileMinifyTransform(BaseTransform):
+    """Collapse JSON lockfiles onto one line and drop YAML lockfile comments"""
+    name = "Lockfile minify"
+
+    def applies_to(self, path):
+        return os.path.basename(path).lower() in LOCKFILE_NAMES
+
+    def transform(self, lines, path):
+        if path.lower().endswith(('.json', '.lock')) and not path.lower().endswith('pubspec.lock'):
+            # JSON strings cannot contain raw newlines, so every line break sits between tokens
+            for line in lines:
+                yield line.strip()
+            yield '\n'
+        else:
+            for line in lines:
+                stripped = line.strip()
+                if stripped and not stripped.startswith('#'):
+                    yield line
+
+
+# Pipeline order: license headers are matched before comment stripping removes them
+TRANSFORMS = {
+    "Drop duplicate license headers": LicenseHeaderTransform,
+    "Strip comments": CommentStripTransform,
+    "Minify lockfiles": LockfileMinifyTransform,
+    "Trim trailing whitespace": TrailingWhitespaceTransform,
+    "Collapse blank lines": BlankLineRunTransform,
+}
+
+
+def create_transforms(names: List[str]) -> List[BaseTransform]:
+    """Instantiate transforms for one extraction, in pipeline order"""
+    return [transform() for name, transform in TRANSFORMS.items() if name in names]
+
+
+def apply_transforms(transforms: List[BaseTransform], lines: Iterable[str], path: str) -> Tuple[str, int]:
+    """Chain the applicable transforms over a line stream and assemble the result once
+
+    Returns the transformed text and the number of source lines that were read.
+    """
+    source_lines = 0
+
+    def counted(source):
+        nonlocal source_lines
+        for line in source:
+            source_lines += 1
+            yield line
+
+    stream = counted(lines)
+    for transform in transforms:
+        if transform.applies_to(path):
+            stream = transform.apply(stream, path)
+    return "".join(stream), source_lines
+
+
+def transform_savings(transforms: List[BaseTransform]) -> Dict[str, int]:
+    return {transform.name: transform.bytes_saved for transform in transforms}
+
+
+def license_header_owners(transforms: List[BaseTransform]) -> Dict[str, str]:
+    """Map each kept license header's digest to the file that kept it"""
+    owners = {}
+    for transform in transforms:
+        if isinstance(transform, LicenseHeaderTransform):
+            owners.update(transform.seen_headers)
+    return owners
+
+
+def seed_license_headers(transforms: List[BaseTransform], header_owners: Dict[str, str], path: str):
+    for transform in transforms:
+        if isinstance(transform, LicenseHeaderTransform):
+            transform.seed(header_owners, path)